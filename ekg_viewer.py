@@ -1,4 +1,5 @@
 import sys
+import time
 from matplotlib import axis
 import numpy as np
 from datetime import datetime
@@ -13,10 +14,12 @@ from PySide6.QtWidgets import (
     QFileDialog,
     QWidget,
 )
-from PySide6.QtCore import QTimer
+from PySide6.QtCore import QTimer, Signal
 import pyqtgraph as pg
 
 from pyqtgraph import PlotWidget, mkPen
+from olimex.clock import LatencyMonitor, SampleClock
+from olimex.constants import PACKET_DTYPE, SAMPLE_FREQUENCY
 from olimex.exg import PacketStreamReader
 import scipy.signal
 import serial
@@ -27,6 +30,16 @@ pg.setConfigOption("background", "w")
 pg.setConfigOption("foreground", "k")
 
 
+class PaintTimedPlotWidget(PlotWidget):
+    """PlotWidget that emits sigPainted after each repaint has finished."""
+
+    sigPainted = Signal()
+
+    def paintEvent(self, ev):
+        super().paintEvent(ev)
+        self.sigPainted.emit()
+
+
 class ECGApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -38,11 +51,20 @@ class ECGApp(QMainWindow):
         self.port = "COM3"
         self.serial_port = None
         self.reader = None
-        self.sampling_rate = 256.0
+        self.sampling_rate = float(SAMPLE_FREQUENCY)
         self.T = 10.0  # seconds to display
         self.subject = "student"
         self.y_data = np.random.rand(round(self.T * self.sampling_rate)) - 0.5
         self.x_data = np.arange(0, len(self.y_data)) / self.sampling_rate
+        # packets shown on screen and their host timestamps (time.perf_counter)
+        self.samples = np.zeros(len(self.y_data), dtype=PACKET_DTYPE)
+        self.samples["channels"] = 512
+        self.t_data = np.full(len(self.y_data), np.nan)
+        # packets read from the serial port during one update_plot call
+        self.new_samples = np.empty(SAMPLE_FREQUENCY, dtype=PACKET_DTYPE)
+        self.arrival_times = np.empty(SAMPLE_FREQUENCY)
+        self.clock = SampleClock(self.sampling_rate)
+        self.latency = LatencyMonitor()
         self.notch_filter_enabled = True
 
         # Set up the main layout
@@ -51,7 +73,10 @@ class ECGApp(QMainWindow):
         self.layout = QVBoxLayout(self.central_widget)
 
         # Add the plot widget
-        self.plot_widget = PlotWidget()
+        self.plot_widget = PaintTimedPlotWidget()
+        # acquisition times of samples passed to setData but not painted yet
+        self.unpainted_sample_times = []
+        self.plot_widget.sigPainted.connect(self.record_latency)
         self.layout.addWidget(self.plot_widget)
         self.plot = self.plot_widget.plot(
             self.x_data, self.y_data, pen=mkPen("k", width=2)
@@ -78,6 +103,10 @@ class ECGApp(QMainWindow):
         self.save_button.clicked.connect(self.save_figure)
         self.layout.addWidget(self.save_button)
 
+        self.save_data_button = QPushButton("Save Data")
+        self.save_data_button.clicked.connect(self.save_data)
+        self.layout.addWidget(self.save_data_button)
+
         self.com_port_input = QLineEdit(self.port)
         self.com_port_input.setPlaceholderText("COM Port")
         self.com_port_input.textChanged.connect(self.update_com_port)
@@ -118,6 +147,9 @@ class ECGApp(QMainWindow):
         self.notch_filter_checkbox.stateChanged.connect(self.toggle_notch_filter)
         self.layout.addWidget(self.notch_filter_checkbox)
 
+        self.timing_label = QLabel()
+        self.layout.addWidget(self.timing_label)
+
         # Timer for updating the plot
         self.timer = QTimer(self)  # Create a QTimer instance
         self.timer.timeout.connect(
@@ -151,6 +183,11 @@ class ECGApp(QMainWindow):
         try:
             self.serial_port = serial.Serial(self.port, self.baud_rate)
             self.reader = PacketStreamReader(self.serial_port)
+            self.clock.reset()
+            self.latency.reset()
+            self.unpainted_sample_times.clear()
+            self.samples["channels"] = 512
+            self.t_data[:] = np.nan
             print(f"{datetime.now()}: Started data acquisition")
         except Exception as e:
             print(f"Error starting acquisition: {e}")
@@ -184,6 +221,39 @@ class ECGApp(QMainWindow):
 
         print(f"{datetime.now()}: Saved figure as {filename}")
 
+    def timestamped_samples(self):
+        """
+        Return the host timestamps (time.perf_counter) and packets of the
+        samples in the displayed time window. Samples that were not received
+        or have no trusted timestamp are left out.
+        """
+        stamped = ~np.isnan(self.t_data)
+        return self.t_data[stamped].copy(), self.samples[stamped].copy()
+
+    def save_data(self):
+        dialog = QFileDialog(self, "Save Data")
+        dialog.setAcceptMode(QFileDialog.AcceptSave)
+        dialog.setNameFilters(["NumPy Files (*.npz)"])
+        dialog.selectFile(f"{self.subject}_ekg_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        dialog.setDefaultSuffix("npz")
+
+        if not dialog.exec():
+            return
+        filename = dialog.selectedFiles()[0]
+
+        timestamps, samples = self.timestamped_samples()
+        # a pair of readings to convert perf_counter timestamps to wall clock
+        np.savez(
+            filename,
+            timestamps=timestamps,
+            samples=samples,
+            perf_counter_reference=time.perf_counter(),
+            unix_time_reference=time.time(),
+            sample_rate=self.clock.sample_rate,
+        )
+
+        print(f"{datetime.now()}: Saved data as {filename}")
+
     def update_com_port(self, text):
         self.port = text
 
@@ -207,31 +277,45 @@ class ECGApp(QMainWindow):
             return
 
         try:
-            new_data = np.array(next(self.get_new_data_points(self.reader)))
-            if len(new_data) == 0:
+            n = self.reader.read_into(self.new_samples, self.arrival_times)
+            if n == 0:
                 return
-            new_data -= 512
-            self.y_data = np.roll(self.y_data, -len(new_data))
+            new_samples = self.new_samples[:n]
+            arrival_times = self.arrival_times[:n]
+            # shift the display buffers in place and append the new packets
+            self.samples[:-n] = self.samples[n:]
+            self.samples[-n:] = new_samples
+            self.t_data[:-n] = self.t_data[n:]
+            self.t_data[-n:] = self.clock.update(new_samples["count"], arrival_times)
+            # convert to float only for filtering and display
+            self.y_data = self.samples["channels"][:, 0] - 512.0
             if self.notch_filter_enabled:
                 self.y_data = self.notch_filter(self.y_data)
-            self.y_data[-len(new_data) :] = new_data
             self.plot.setData(self.x_data, self.y_data)
+            # setData only schedules a repaint, the display time is taken
+            # once the plot has actually been painted
+            self.unpainted_sample_times.append(self.t_data[-n:].copy())
         except Exception as e:
             print(f"Error updating plot: {e}")
 
-    def get_new_data_points(self, packet_reader):
-        new_data = np.empty((100,))
-        while True:
-            iIteration = 0
-            nDataPoints = 0
-            while iIteration < 100:
-                iIteration += 1
-                channel_values = next(packet_reader, None)
-                if channel_values:
-                    channel_1, *_ = channel_values
-                    new_data[nDataPoints] = channel_1
-                    nDataPoints += 1
-            yield new_data[:nDataPoints]
+    def record_latency(self):
+        if not self.unpainted_sample_times:
+            return
+        display_time = time.perf_counter()
+        for sample_times in self.unpainted_sample_times:
+            self.latency.record(sample_times, display_time)
+        self.unpainted_sample_times.clear()
+        self.update_timing_label()
+
+    def update_timing_label(self):
+        self.timing_label.setText(
+            f"Sample rate: {self.clock.sample_rate:.2f} Hz "
+            f"(drift {self.clock.drift_ppm:+.0f} ppm, "
+            f"{self.clock.dropped_samples} dropped) | "
+            f"Acquisition-to-screen latency: last {self.latency.last * 1000:.0f} ms, "
+            f"mean {self.latency.mean * 1000:.0f} ms, "
+            f"max {self.latency.max * 1000:.0f} ms"
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,314 @@
+"""
+This module defines helpers for placing Olimex-EKG-EMG samples on the
+host clock and for measuring how long samples take to reach the screen.
+
+The shield does not send timestamps. Every packet only carries an 8-bit
+counter that increases by one per sample and wraps around at 256. The
+host, on the other hand, knows when a packet was read from the serial
+port, but that arrival time is delayed by a variable amount (USB
+buffering, OS scheduling, GUI load).
+
+:py:class:`SampleClock` fuses both sources: the counter gives an exact
+sample index (including dropped packets), the arrival times give a
+noisy measurement of when each index was sampled. A straight line fitted
+through (index, arrival time) over a sliding window yields the actual
+device sample rate. Since a packet can only arrive late, never early,
+the line is fitted to the lower envelope of the arrivals: it is refitted
+a few times on the points at or below the previous line, which drops
+packets that were held up by a stalled GUI thread. Finally the line is
+shifted down onto the earliest arrival.
+
+A corrupted counter byte (or a false sync) shows up as a jump of more
+than ``max_counter_gap``. Such packets get a NaN timestamp and are
+neither counted as drops nor used for the fit. Only if several
+consecutive packets agree on the jump is it accepted as a real gap.
+"""
+
+import time
+
+import numpy as np
+
+from olimex.constants import COUNTER_MODULUS, SAMPLE_FREQUENCY
+
+# refits of the sample rate on the points at or below the previous line
+ENVELOPE_ITERATIONS = 8
+ENVELOPE_MIN_POINTS = 32
+
+
+class _RingBuffer:
+    """Fixed-size float64 history that keeps the most recent values."""
+
+    def __init__(self, capacity):
+        self._data = np.empty(capacity, dtype=np.float64)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, values):
+        capacity = len(self._data)
+        values = values[-capacity:]
+        positions = (self._head + np.arange(len(values))) % capacity
+        self._data[positions] = values
+        self._head = (self._head + len(values)) % capacity
+        self._size = min(self._size + len(values), capacity)
+
+    def values(self):
+        if self._size < len(self._data):
+            return self._data[: self._size]
+        return np.roll(self._data, -self._head)
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+
+class SampleClock:
+    """
+    Estimate the device sample rate from packet counters and host
+    arrival times and assign each sample a host timestamp.
+
+    Arrival times must come from :py:func:`time.perf_counter`, the
+    returned timestamps are on the same clock. Each batch is stamped with
+    the current estimate, so timestamps are not guaranteed to increase
+    monotonically across batches before the first fit (after
+    ``min_fit_duration``) and may still step slightly while the estimate
+    settles. For example::
+
+        clock = SampleClock()
+        timestamps = clock.update(counts, arrival_times)
+        print(clock.sample_rate, clock.drift_ppm)
+    """
+
+    def __init__(
+        self,
+        nominal_rate=SAMPLE_FREQUENCY,
+        window=30.0,
+        min_fit_duration=2.0,
+        max_counter_gap=16,
+        resync_packets=3,
+    ):
+        self.nominal_rate = float(nominal_rate)
+        self.sample_rate = self.nominal_rate
+        capacity = round(window * self.nominal_rate)
+        self._indices = _RingBuffer(capacity)
+        self._arrivals = _RingBuffer(capacity)
+        self._min_fit_samples = round(min_fit_duration * self.nominal_rate)
+        self.max_counter_gap = max_counter_gap
+        self.resync_packets = resync_packets
+        self.reset()
+
+    @property
+    def drift_ppm(self):
+        """Deviation of the estimated from the nominal sample rate in ppm."""
+        return (self.sample_rate / self.nominal_rate - 1.0) * 1e6
+
+    def reset(self):
+        self.sample_rate = self.nominal_rate
+        self._indices.clear()
+        self._arrivals.clear()
+        # counter, index and arrival time of the last trusted packet
+        self._last_count = None
+        self._last_good_index = -1
+        self._last_good_arrival = 0.0
+        # index assigned to the most recent packet, trusted or not
+        self._last_index = -1
+        # run of consecutive packets with an implausible counter
+        self._suspect_count = None
+        self._suspect_run = 0
+        self._epoch = None
+        self._offset = 0.0
+        self.dropped_samples = 0
+        # packets with an implausible counter, not used for the fit
+        self.rejected_samples = 0
+
+    def update(self, counts, arrival_times):
+        """
+        Add a batch of packets and return the host timestamps of their samples.
+
+        Samples whose counter could not be trusted get a NaN timestamp.
+
+        :param counts: packet counters (0 - 255) in order of arrival
+        :param arrival_times: host time at which each packet was read
+        :rtype: numpy.ndarray
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        arrival_times = np.asarray(arrival_times, dtype=np.float64)
+        if len(counts) == 0:
+            return np.empty(0, dtype=np.float64)
+
+        if self._epoch is None:
+            # fit relative to the first arrival to keep the numbers small
+            self._epoch = arrival_times[0]
+            self._last_count = counts[0] - 1
+
+        arrival_times = arrival_times - self._epoch
+        steps = np.diff(counts, prepend=self._last_count) % COUNTER_MODULUS
+        if self._suspect_run == 0 and np.all(
+            (steps > 0) & (steps <= self.max_counter_gap)
+        ):
+            self.dropped_samples += int(np.sum(steps - 1))
+            indices = self._last_index + np.cumsum(steps)
+            valid = None
+            self._last_count = counts[-1]
+            self._last_good_index = indices[-1]
+            self._last_good_arrival = arrival_times[-1]
+            self._last_index = indices[-1]
+        else:
+            indices, valid = self._unwrap_with_outliers(counts, arrival_times)
+
+        if valid is None:
+            self._indices.extend(indices.astype(np.float64))
+            self._arrivals.extend(arrival_times)
+        else:
+            self._indices.extend(indices[valid].astype(np.float64))
+            self._arrivals.extend(arrival_times[valid])
+        self._fit()
+
+        timestamps = self._epoch + self._offset + indices / self.sample_rate
+        if valid is not None:
+            timestamps[~valid] = np.nan
+        return timestamps
+
+    def _unwrap_with_outliers(self, counts, arrival_times):
+        """
+        Slow path of :py:meth:`update` for batches with implausible counter
+        jumps. Return the sample indices and a mask of trusted packets.
+        """
+        indices = np.empty(len(counts), dtype=np.int64)
+        valid = np.zeros(len(counts), dtype=bool)
+
+        for i, (count, arrival) in enumerate(zip(counts, arrival_times)):
+            step = (count - self._last_count) % COUNTER_MODULUS
+            if 0 < step <= self.max_counter_gap:
+                index = self._last_good_index + step
+                # samples in between that were received with a bad counter
+                # are not missing
+                n_suspects = self._last_index - self._last_good_index
+                self.dropped_samples += max(step - 1 - n_suspects, 0)
+                self._suspect_run = 0
+                valid[i] = True
+            else:
+                consistent = (
+                    self._suspect_run
+                    and (count - self._suspect_count) % COUNTER_MODULUS == 1
+                )
+                self._suspect_run = self._suspect_run + 1 if consistent else 1
+                self._suspect_count = count
+                index = self._last_index + 1
+                self.rejected_samples += 1
+
+                if self._suspect_run >= self.resync_packets:
+                    # several packets agree: accept a real gap, its length
+                    # modulo the counter period is taken from the arrival time
+                    expected = self._last_good_index + (
+                        (arrival - self._last_good_arrival) * self.sample_rate
+                    )
+                    wraps = np.round((expected - count) / COUNTER_MODULUS)
+                    index = max(int(count + wraps * COUNTER_MODULUS), self._last_index + 1)
+                    self.dropped_samples += max(
+                        index - self._last_good_index - self._suspect_run, 0
+                    )
+                    self._suspect_run = 0
+                    valid[i] = True
+
+            if valid[i]:
+                self._last_count = count
+                self._last_good_index = index
+                self._last_good_arrival = arrival
+            indices[i] = index
+            self._last_index = index
+
+        return indices, valid
+
+    def _fit(self):
+        indices = self._indices.values()
+        arrivals = self._arrivals.values()
+
+        if len(indices) >= self._min_fit_samples:
+            slope, intercept = _fit_line(indices, arrivals)
+            for _ in range(ENVELOPE_ITERATIONS):
+                below = arrivals - (intercept + slope * indices) <= 0
+                if np.count_nonzero(below) < ENVELOPE_MIN_POINTS:
+                    break
+                slope, intercept = _fit_line(indices[below], arrivals[below])
+            if slope > 0:
+                self.sample_rate = 1.0 / slope
+
+        # packets never arrive before they were sampled: put the line
+        # through the earliest arrival
+        self._offset = np.min(arrivals - indices / self.sample_rate)
+
+
+def _fit_line(x, y):
+    """Return slope and intercept of the least-squares line through x, y."""
+    x_mean = x.mean()
+    y_mean = y.mean()
+    centered = x - x_mean
+    slope = np.dot(centered, y - y_mean) / np.dot(centered, centered)
+    return slope, y_mean - slope * x_mean
+
+
+class LatencyMonitor:
+    """
+    Record the time between a sample being acquired and the sample being
+    shown on screen.
+
+    Acquisition times are the host timestamps estimated by
+    :py:class:`SampleClock`, so the latency includes the time a packet
+    waits in the serial buffer before it is read. Latencies are kept for
+    the last ``history`` samples, for example::
+
+        monitor = LatencyMonitor()
+        timestamps = clock.update(counts, arrival_times)
+        plot.setData(x, y)
+        # ... once the plot has been repainted
+        monitor.record(timestamps)
+        print(monitor.mean, monitor.max)
+    """
+
+    def __init__(self, history=SAMPLE_FREQUENCY * 60):
+        self._latencies = _RingBuffer(history)
+        self.last = float("nan")
+
+    def record(self, sample_times, display_time=None):
+        """
+        Record the latency of samples that have just been displayed.
+
+        :param sample_times: estimated acquisition time of each displayed
+            sample, as returned by :py:meth:`SampleClock.update`; NaN
+            entries are ignored
+        :param display_time: host time at which the samples were displayed,
+            defaults to now
+        """
+        sample_times = np.asarray(sample_times, dtype=np.float64)
+        sample_times = sample_times[~np.isnan(sample_times)]
+        if len(sample_times) == 0:
+            return
+        if display_time is None:
+            display_time = time.perf_counter()
+        latencies = display_time - sample_times
+        self._latencies.extend(latencies)
+        self.last = float(latencies.max())
+
+    def reset(self):
+        self._latencies.clear()
+        self.last = float("nan")
+
+    @property
+    def mean(self):
+        if not len(self._latencies):
+            return float("nan")
+        return float(self._latencies.values().mean())
+
+    @property
+    def max(self):
+        if not len(self._latencies):
+            return float("nan")
+        return float(self._latencies.values().max())
+
+    def percentile(self, q):
+        if not len(self._latencies):
+            return float("nan")
+        return float(np.percentile(self._latencies.values(), q))
@@ -2,12 +2,16 @@
 This module defines constants used throughout this package.
 """
 
+import numpy as np
+
 NUMCHANNELS = 6
 HEADERLEN = 4
 PACKET_SIZE = NUMCHANNELS * 2 + HEADERLEN + 1
 SAMPLE_FREQUENCY = 256  # ADC sampling rate 125
+COUNTER_MODULUS = 256  # the 8-bit packet counter wraps around here
 SYNC0 = b"\xa5"  # 0xa5, b'\xa5', 165
 SYNC1 = b"Z"  # 0x5a, b'Z', 90
+PACKET_VERSION = 2
 
 DEFAULT_BAUDRATE = 57600
 
@@ -19,3 +23,26 @@ PACKET_SLICES = {
     "data": slice(4, 16),
     "switches": slice(16),
 }
+
+# A packet as it is sent over the wire (see olimex.exg), 17 bytes.
+RAW_PACKET_DTYPE = np.dtype(
+    [
+        ("sync0", np.uint8),
+        ("sync1", np.uint8),
+        ("version", np.uint8),
+        ("count", np.uint8),
+        ("data", ">u2", (NUMCHANNELS,)),
+        ("switches", np.uint8),
+    ]
+)
+
+# A decoded packet, 15 bytes. Channel values are flipped like in
+# olimex.utils.calculate_values_from_packet_data (1 - 1024).
+PACKET_DTYPE = np.dtype(
+    [
+        ("count", np.uint8),
+        ("version", np.uint8),
+        ("channels", np.int16, (NUMCHANNELS,)),
+        ("switches", np.uint8),
+    ]
+)
@@ -32,8 +32,17 @@ shield packet is organized are below::
 
 import time
 
-from olimex.constants import PACKET_SIZE, PACKET_SLICES, SAMPLE_FREQUENCY, SYNC0, SYNC1
-from olimex.utils import calculate_values_from_packet_data
+import numpy as np
+
+from olimex.constants import (
+    PACKET_SIZE,
+    PACKET_SLICES,
+    PACKET_VERSION,
+    RAW_PACKET_DTYPE,
+    SYNC0,
+    SYNC1,
+)
+from olimex.utils import calculate_values_from_packet_data, decode_packets
 
 
 class PacketStreamReader:
@@ -46,17 +55,33 @@ class PacketStreamReader:
         serial = serial.Serial(port, 115200)
         reader = PacketStreamReader(serial)
         packet = next(reader)
+
+    To read everything that is waiting in one go, pass a preallocated
+    array of :py:data:`olimex.constants.PACKET_DTYPE` to :py:meth:`read_into`::
+
+        packets = np.empty(256, dtype=PACKET_DTYPE)
+        n = reader.read_into(packets)
+
+    Both ways of reading keep their own state and must not be mixed on
+    the same reader.
     """
 
     def __init__(self, serial):
         self._serial = serial
         # data members for tracking performance
         self._packet_index = 0
-        self.start_time = time.perf_counter()
-        self.times = []
         self.ret_none_count = 0
+        # bytes read by read_into, a partial packet is carried over
+        # to the next call; grown on demand
+        self._buffer = np.empty(0, dtype=np.uint8)
+        self._n_buffered = 0
 
-    def _get_next_packet(self):
+    def _find_sync(self):
+        """
+        Consume bytes up to and including the next sync bytes.
+
+        Return False if not enough data is waiting for a full packet.
+        """
         byte0, byte1 = 0, 0
 
         while byte0 != SYNC0 or byte1 != SYNC1:
@@ -69,12 +94,18 @@ class PacketStreamReader:
             # attempting to get the next packet.
             in_waiting = self._serial.inWaiting()
             if in_waiting < PACKET_SIZE - 1:
-                return None
+                return False
             byte0, byte1 = byte1, self._serial.read()
 
+        return True
+
+    def _get_next_packet(self):
+        if not self._find_sync():
+            return None
+
         buff = bytearray()
-        buff.append(ord(byte0))
-        buff.append(ord(byte1))
+        buff.extend(SYNC0)
+        buff.extend(SYNC1)
         # read 15 more bytes and parse result
         buff.extend(self._serial.read(PACKET_SIZE - 2))
         return buff
@@ -87,6 +118,101 @@ class PacketStreamReader:
         data = packet[PACKET_SLICES["data"]]
         return calculate_values_from_packet_data(data)
 
+    def read_into(self, out, arrival_times=None):
+        """
+        Read the packets that are waiting, up to ``len(out)``, and decode
+        them into ``out``.
+
+        Everything waiting on the serial port is read in a single call and
+        decoded as one batch, so all packets of a batch get the same
+        arrival time: the host time right after the read. Packets carried
+        over from the previous call get this later time too, which is
+        harmless for :py:class:`olimex.clock.SampleClock` since it only
+        relies on the earliest arrivals.
+
+        :param out: preallocated array of :py:data:`olimex.constants.PACKET_DTYPE`
+        :param arrival_times: optional preallocated float array that
+            receives the host arrival time (:py:func:`time.perf_counter`)
+            of each packet
+        :returns: the number of packets read
+        """
+        self._fill_buffer(len(out))
+        arrival_time = time.perf_counter()
+
+        n_packets = 0
+        position = 0
+        while n_packets < len(out):
+            start = self._find_sync_in_buffer(position)
+            n_complete = (self._n_buffered - start) // PACKET_SIZE
+            n_batch = min(n_complete, len(out) - n_packets)
+            position = start
+            if n_batch == 0:
+                break
+
+            raw = self._buffer[start : start + n_batch * PACKET_SIZE].view(
+                RAW_PACKET_DTYPE
+            )
+            valid = (
+                (raw["sync0"] == SYNC0[0])
+                & (raw["sync1"] == SYNC1[0])
+                & (raw["version"] == PACKET_VERSION)
+            )
+            if not valid[0]:
+                # false sync, search again from the next byte
+                position = start + 1
+                continue
+            if not valid.all():
+                # lost sync within the batch, keep the packets up to there
+                n_batch = int(np.argmin(valid))
+
+            decode_packets(raw[:n_batch], out[n_packets:])
+            n_packets += n_batch
+            position = start + n_batch * PACKET_SIZE
+
+        # carry the unread rest over to the next call
+        n_rest = self._n_buffered - position
+        self._buffer[:n_rest] = self._buffer[position : self._n_buffered]
+        self._n_buffered = n_rest
+
+        if n_packets:
+            if arrival_times is not None:
+                arrival_times[:n_packets] = arrival_time
+            self._packet_index += n_packets
+            self.ret_none_count = 0
+        else:
+            self.ret_none_count += 1
+
+        return n_packets
+
+    def _fill_buffer(self, n_packets):
+        """Append what is waiting on the serial port to the buffer."""
+        capacity = (n_packets + 1) * PACKET_SIZE
+        if len(self._buffer) < capacity:
+            buffer = np.empty(capacity, dtype=np.uint8)
+            buffer[: self._n_buffered] = self._buffer[: self._n_buffered]
+            self._buffer = buffer
+
+        n_bytes = min(self._serial.inWaiting(), len(self._buffer) - self._n_buffered)
+        if n_bytes <= 0:
+            return
+        data = np.frombuffer(self._serial.read(n_bytes), dtype=np.uint8)
+        self._buffer[self._n_buffered : self._n_buffered + len(data)] = data
+        self._n_buffered += len(data)
+
+    def _find_sync_in_buffer(self, position):
+        """
+        Return the offset of the next sync bytes in the buffer at or after
+        ``position``. If there are none, return the offset of the bytes
+        that have to be kept for the next call.
+        """
+        buffered = self._buffer[position : self._n_buffered]
+        matches = np.flatnonzero((buffered[:-1] == SYNC0[0]) & (buffered[1:] == SYNC1[0]))
+        if len(matches):
+            return position + int(matches[0])
+        if len(buffered) and buffered[-1] == SYNC0[0]:
+            return self._n_buffered - 1
+        return self._n_buffered
+
     @property
     def packets_in_waiting(self):
         return self._serial.inWaiting() // PACKET_SIZE
@@ -95,9 +221,6 @@ class PacketStreamReader:
         return self
 
     def __next__(self):
-        if not self._packet_index % SAMPLE_FREQUENCY:
-            self.times.append(time.perf_counter() - self.start_time)
-
         values = self._get_next_packet_values()
 
         if values is None:
@@ -39,6 +39,28 @@ def calculate_values_from_packet_data(data):
     return values
 
 
+def decode_packets(raw, out):
+    """
+    Decode packets in wire format into preallocated packet records.
+
+    :param raw: array of :py:data:`olimex.constants.RAW_PACKET_DTYPE`
+    :param out: array of :py:data:`olimex.constants.PACKET_DTYPE`,
+        at least as long as ``raw``
+    :returns: ``out[:len(raw)]``
+
+    This is the vectorized counterpart of
+    :py:func:`calculate_values_from_packet_data`.
+    """
+    out = out[: len(raw)]
+    out["count"] = raw["count"]
+    out["version"] = raw["version"]
+    # Flip data around a horizontal axis, see
+    # calculate_values_from_packet_data.
+    np.subtract(1024, raw["data"], out=out["channels"], casting="unsafe")
+    out["switches"] = raw["switches"]
+    return out
+
+
 def calculate_heart_rate(data):
     return np.fft.rfft(data)
 
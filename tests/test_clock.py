@@ -0,0 +1,96 @@
+import numpy as np
+
+from olimex.clock import LatencyMonitor, SampleClock
+
+SAMPLE_RATE = 256.1
+READ_PERIOD = 0.05
+READ_DELAY = 0.001
+
+
+def simulate(n_samples=20000, dropped=(), corrupted=()):
+    """
+    Feed a simulated source into a SampleClock in batches, the way the
+    viewer reads it every timer tick. Return the clock, the timestamps it
+    assigned and the true acquisition times.
+    """
+    indices = np.delete(np.arange(n_samples), list(dropped))
+    sample_times = 5.0 + indices / SAMPLE_RATE
+    read_times = np.ceil(sample_times / READ_PERIOD) * READ_PERIOD + READ_DELAY
+    counts = indices % 256
+    for position in corrupted:
+        counts[position] = (counts[position] + 100) % 256
+
+    clock = SampleClock()
+    timestamps = np.empty(len(indices))
+    for read_time in np.unique(read_times):
+        batch = read_times == read_time
+        timestamps[batch] = clock.update(counts[batch], read_times[batch])
+    return clock, timestamps, sample_times
+
+
+def test_sample_rate_and_timestamps():
+    clock, timestamps, sample_times = simulate()
+    assert abs(clock.sample_rate - SAMPLE_RATE) < 0.01
+    assert abs(clock.drift_ppm - (SAMPLE_RATE / 256 - 1) * 1e6) < 50
+    assert clock.dropped_samples == 0
+    # the counter wraps around many times; a wrong unwrap would be off by seconds
+    assert np.abs(timestamps - sample_times)[-1000:].max() < 0.005
+
+
+def test_first_count_zero():
+    clock = SampleClock()
+    timestamps = clock.update([0, 1, 2], [1.0, 1.0, 1.0])
+    np.testing.assert_allclose(np.diff(timestamps), 1 / 256)
+    assert clock.dropped_samples == 0
+
+
+def test_dropped_packet():
+    clock, timestamps, sample_times = simulate(dropped=[300])
+    assert clock.dropped_samples == 1
+    assert np.abs(timestamps - sample_times)[-1000:].max() < 0.005
+
+
+def test_corrupted_counter_is_not_a_drop():
+    clock, timestamps, sample_times = simulate(corrupted=[5000])
+    assert clock.dropped_samples == 0
+    assert clock.rejected_samples == 1
+    assert abs(clock.sample_rate - SAMPLE_RATE) < 0.01
+    assert np.isnan(timestamps[5000])
+    assert np.nanmax(np.abs(timestamps - sample_times)) < 0.005
+
+
+def test_real_gap_suspects_are_not_stamped():
+    clock, timestamps, sample_times = simulate(dropped=range(8000, 9000))
+    # the packets before the gap is accepted have no trusted timestamp
+    assert np.count_nonzero(np.isnan(timestamps)) == clock.resync_packets - 1
+    assert clock.dropped_samples == 1000
+    assert np.nanmax(np.abs(timestamps - sample_times)) < 0.01
+
+
+def test_sample_rate_with_stalled_reads():
+    # a 255.9 Hz source read every 50 ms with jitter, 1 % of the reads
+    # are held up by 400 ms
+    sample_rate = 255.9
+    rng = np.random.default_rng(0)
+    clock = SampleClock()
+    n_read = 0
+    read_time = 0.0
+    while read_time < 120.0:
+        read_time += READ_PERIOD + rng.uniform(0, 0.01)
+        if rng.random() < 0.01:
+            read_time += 0.4
+        n_available = int(read_time * sample_rate) - n_read
+        indices = n_read + np.arange(n_available)
+        clock.update(indices % 256, np.full(n_available, read_time + READ_DELAY))
+        n_read += n_available
+
+    true_drift_ppm = (sample_rate / 256 - 1) * 1e6
+    assert abs(clock.drift_ppm - true_drift_ppm) < 30
+
+
+def test_latency_monitor():
+    monitor = LatencyMonitor()
+    monitor.record([1.0, 1.5, np.nan], display_time=2.0)
+    assert monitor.last == 1.0
+    assert monitor.mean == 0.75
+    assert monitor.max == 1.0
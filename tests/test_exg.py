@@ -0,0 +1,112 @@
+import numpy as np
+
+from olimex.constants import PACKET_DTYPE, PACKET_SLICES
+from olimex.exg import PacketStreamReader
+from olimex.utils import calculate_values_from_packet_data
+
+
+class FakeSerial:
+    """Serial port stand-in that hands out the bytes fed to it."""
+
+    def __init__(self, data=b""):
+        self._data = bytearray(data)
+
+    def feed(self, data):
+        self._data.extend(data)
+
+    def inWaiting(self):
+        return len(self._data)
+
+    def read(self, size=1):
+        data = bytes(self._data[:size])
+        del self._data[:size]
+        return data
+
+    def close(self):
+        pass
+
+
+def make_packet(count, version=2):
+    # cover the full 10-bit range, including the 0 and 1023 edge values
+    values = [(count * 37 + channel * 171) % 1024 for channel in range(6)]
+    data = b"".join(value.to_bytes(2, "big") for value in values)
+    return bytes([0xA5, 0x5A, version, count % 256]) + data + bytes([count % 16])
+
+
+def read_all(reader, serial, chunks, size=64):
+    """Feed chunks one by one and collect everything read_into returns."""
+    out = np.empty(size, dtype=PACKET_DTYPE)
+    packets = []
+    for chunk in chunks + [b""] * 4:
+        serial.feed(chunk)
+        n = reader.read_into(out)
+        packets.append(out[:n].copy())
+    return np.concatenate(packets)
+
+
+def test_chunked_delivery_matches_packet_values():
+    raw_packets = [make_packet(count) for count in range(1000)]
+    stream = b"".join(raw_packets)
+    rng = np.random.default_rng(0)
+    cuts = np.sort(rng.integers(0, len(stream), 200))
+    chunks = [stream[start:stop] for start, stop in zip([0, *cuts], [*cuts, len(stream)])]
+
+    serial = FakeSerial()
+    packets = read_all(PacketStreamReader(serial), serial, chunks)
+
+    assert len(packets) == 1000
+    for packet, raw in zip(packets, raw_packets):
+        expected = calculate_values_from_packet_data(raw[PACKET_SLICES["data"]])
+        assert packet["channels"].tolist() == expected
+        assert packet["count"] == raw[3]
+        assert packet["version"] == 2
+        assert packet["switches"] == raw[16]
+
+
+def test_garbage_false_sync_and_wrong_version_are_skipped():
+    stream = (
+        b"\x00\x11\xa5\x5a\x07"  # garbage and a false sync
+        + make_packet(0)
+        + make_packet(1)
+        + make_packet(99, version=3)
+        + make_packet(2)
+        + b"\xa5"  # lost sync in the middle of a batch
+        + make_packet(3)
+    )
+    serial = FakeSerial()
+    packets = read_all(PacketStreamReader(serial), serial, [stream])
+    assert packets["count"].tolist() == [0, 1, 2, 3]
+
+
+def test_partial_packet_is_carried_over():
+    packet = make_packet(5)
+    serial = FakeSerial(packet[:10])
+    reader = PacketStreamReader(serial)
+    out = np.empty(4, dtype=PACKET_DTYPE)
+    assert reader.read_into(out) == 0
+    serial.feed(packet[10:])
+    assert reader.read_into(out) == 1
+    assert out["count"][0] == 5
+
+
+def test_out_length_caps_batch():
+    serial = FakeSerial(b"".join(make_packet(count) for count in range(10)))
+    reader = PacketStreamReader(serial)
+    out = np.empty(4, dtype=PACKET_DTYPE)
+    counts = []
+    for _ in range(4):
+        n = reader.read_into(out)
+        counts.extend(out["count"][:n].tolist())
+    assert counts == list(range(10))
+
+
+def test_arrival_times_filled_for_packets_read():
+    serial = FakeSerial(b"".join(make_packet(count) for count in range(3)))
+    reader = PacketStreamReader(serial)
+    out = np.empty(8, dtype=PACKET_DTYPE)
+    arrival_times = np.full(8, -1.0)
+    n = reader.read_into(out, arrival_times)
+    assert n == 3
+    assert np.all(arrival_times[:n] == arrival_times[0])
+    assert arrival_times[0] > 0
+    assert np.all(arrival_times[n:] == -1.0)